@@ -0,0 +1,177 @@
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+FIELDS = ("latitude", "longitude", "altitude")
+
+# header layout (int64): sequence counter, number of drones
+_SEQ, _N_DRONES, _HEADER_LEN = 0, 1, 2
+
+
+class FleetState:
+    """
+    Fleet positions in a multiprocessing.shared_memory block, written by one simulation process and read by any
+    number of API workers.
+
+    The block holds two position buffers and a sequence counter (seqlock over a double buffer). The writer fills
+    the inactive buffer while the counter is odd, then bumps the counter to publish it. Readers get a NumPy view of
+    the published buffer, with no copy and no lock, and only have to retry if the writer has started overwriting
+    that same buffer, i.e. after two further writes.
+
+    Stores are ordered by the interpreter and on x86 hardware, which is what this relies on; there are no explicit
+    memory fences from Python.
+    """
+
+    def __init__(self, shm, owner):
+        self._shm = shm
+        self._owner = owner
+        if shm.size < 8 * _HEADER_LEN:
+            raise ValueError("[Error][FleetState] shared memory block %s is too small for a fleet state" % shm.name)
+        self._header = np.ndarray((_HEADER_LEN,), dtype=np.int64, buffer=shm.buf)
+        n_drones = int(self._header[_N_DRONES])
+        if shm.size < 8 * (_HEADER_LEN + 2 + 2 * n_drones * len(FIELDS)):
+            raise ValueError("[Error][FleetState] shared memory block %s is too small for a fleet state" % shm.name)
+        self._times = np.ndarray((2,), dtype=np.float64, buffer=shm.buf, offset=self._header.nbytes)
+        self._buffers = np.ndarray(
+            (2, n_drones, len(FIELDS)),
+            dtype=np.float64,
+            buffer=shm.buf,
+            offset=self._header.nbytes + self._times.nbytes
+        )
+        # readers must never write through their views
+        if not owner:
+            self._times.flags.writeable = False
+            self._buffers.flags.writeable = False
+
+    @classmethod
+    def create(cls, n_drones, name=None):
+        """
+        Allocates a new shared block for n_drones. The creating process owns it and is the only writer.
+        """
+        nbytes = 8 * (_HEADER_LEN + 2 + 2 * n_drones * len(FIELDS))
+        shm = shared_memory.SharedMemory(name=name, create=True, size=nbytes)
+        header = np.ndarray((_HEADER_LEN,), dtype=np.int64, buffer=shm.buf)
+        header[_SEQ] = 0
+        header[_N_DRONES] = n_drones
+        del header
+        state = cls(shm, owner=True)
+        state._times[:] = np.nan
+        state._buffers[:] = np.nan
+        return state
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attaches read-only to a block created by another process.
+
+        The attachment is never registered with the resource tracker, so only the writer's registration exists and
+        the tracker unlinks the block if the writer dies. Python 3.13+ does this with track=False. Before 3.13,
+        SharedMemory always registers, and the tracker is shared with forked and spawned children, so the
+        registration is suppressed while opening instead of unregistering afterwards (which would drop the
+        writer's entry). That suppression patches resource_tracker.register, so do not create blocks from another
+        thread while attaching.
+        """
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, owner=False)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def n_drones(self):
+        return self._buffers.shape[1]
+
+    def write(self, positions, timestamp):
+        """
+        Publishes a new (n_drones, 3) array of latitude, longitude, altitude. Only the owning process may write.
+        """
+        if not self._owner:
+            raise ValueError("[Error][FleetState.write] only the process that created the fleet state may write")
+
+        seq = int(self._header[_SEQ])
+        target = (seq // 2 + 1) % 2
+        self._header[_SEQ] = seq + 1
+        self._buffers[target] = positions
+        self._times[target] = timestamp
+        self._header[_SEQ] = seq + 2
+
+    def read(self, fn, max_retries=100):
+        """
+        Calls fn(positions, timestamp) on views of the latest published snapshot and returns its result.
+
+        fn must not keep the views beyond the call; anything it returns has to be built from them (e.g. a
+        response model). If the writer overwrote the snapshot during the call, fn is called again on a newer one.
+        """
+        for _ in range(max_retries):
+            seq = int(self._header[_SEQ])
+            active = (seq // 2) % 2
+            result = fn(self._buffers[active], float(self._times[active]))
+            # the active buffer only becomes a write target once the counter passes the next publish
+            if int(self._header[_SEQ]) <= seq - seq % 2 + 2:
+                return result
+
+        raise RuntimeError("[Error][FleetState.read] no consistent snapshot after %d retries" % max_retries)
+
+    def close(self):
+        """
+        Releases this process's mapping, and the block itself if this process created it.
+        """
+        del self._header, self._times, self._buffers
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _check_writer(name, n_drones, n_writes, created, attached):
+    fleet = FleetState.create(n_drones, name=name)
+    created.set()
+    attached.wait()
+    try:
+        for i in range(1, n_writes + 1):
+            fleet.write(np.full((n_drones, len(FIELDS)), float(i)), float(i))
+    finally:
+        # the reader's mapping stays valid after the block is unlinked
+        fleet.close()
+
+
+if __name__ == "__main__":
+
+    # Consistency check: one writer process publishes snapshots whose values all equal their timestamp, while this
+    # process reads as fast as it can; any mixed snapshot means a torn read got through.
+    import multiprocessing
+    import os
+
+    name = f"fleet_state_check_{os.getpid()}"
+    n_writes = 200000
+    created, attached = multiprocessing.Event(), multiprocessing.Event()
+    writer = multiprocessing.Process(target=_check_writer, args=(name, 50, n_writes, created, attached))
+    writer.start()
+
+    created.wait()
+    fleet = FleetState.attach(name)
+    attached.set()
+
+    n_reads, n_torn = 0, 0
+    last = np.nan
+    while last != n_writes:
+        consistent, last = fleet.read(
+            lambda positions, timestamp: (np.isnan(timestamp) or bool((positions == timestamp).all()), timestamp)
+        )
+        n_reads += 1
+        n_torn += not consistent
+    fleet.close()
+    writer.join()
+
+    print(f"[Info] {n_reads} reads, {n_torn} torn")
+    if n_torn:
+        raise SystemExit(1)
@@ -0,0 +1,300 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+from scipy.optimize import differential_evolution
+from scipy.spatial.distance import cdist
+from scipy.stats import qmc
+
+from intercept import find_interception
+from drone_coverage import detection_range, v2
+
+radius_bounds = (0, detection_range)  # (m)
+height_bounds = (0, 5e3)  # (m)
+uncovered_penalty = -2 * detection_range  # score of a threat no drone can reach (m)
+
+
+def make_threat_sector(azimuth_range, height_range=(2e3, 10e3), n_azimuth=20, n_height=5,
+                       azimuth_density=None, required_dist=0.0):
+    """
+    Builds a set of threat samples over an azimuthal sector of the detection range.
+
+    Parameters:
+    - azimuth_range: (az_min, az_max) - Sector of incoming threats (rad)
+    - height_range: (h_min, h_max) - Heights at which threats are detected (m)
+    - n_azimuth: Number of azimuthal samples
+    - n_height: Number of height samples
+    - azimuth_density: Optional callable giving the relative threat density at an azimuth. Samples are
+      placed by inverse CDF, so dense bearings get more threats. Uniform if None.
+    - required_dist: Minimum intercept distance from the origin (m), either a scalar or a callable of azimuth
+
+    Returns:
+    - threats: (T, 3) array of (azimuth, height, required intercept distance) per threat
+    """
+
+    az_min, az_max = azimuth_range
+    if azimuth_density is None:
+        azimuths = np.linspace(az_min, az_max, n_azimuth)
+    else:
+        # piecewise constant density on grid cells, evaluated at the cell midpoints
+        grid = np.linspace(az_min, az_max, 1001)
+        mass = np.maximum(azimuth_density((grid[:-1] + grid[1:]) / 2), 0)
+        cdf = np.concatenate([[0], np.cumsum(mass)])
+        if not cdf[-1] > 0:
+            raise ValueError("[Error][make_threat_sector] azimuth_density must be positive somewhere in the sector")
+        cdf = cdf / cdf[-1]
+        # mid-quantiles, so the flat CDF tails of a density that vanishes near an edge are never sampled
+        azimuths = np.interp((np.arange(n_azimuth) + 0.5) / n_azimuth, cdf, grid)
+
+    heights = np.linspace(height_range[0], height_range[1], n_height)
+    az, h = np.meshgrid(azimuths, heights, indexing='ij')
+    az, h = az.ravel(), h.ravel()
+    required = required_dist(az) if callable(required_dist) else np.full_like(az, required_dist)
+
+    return np.column_stack([az, h, required])
+
+
+def layout_bounds(rings):
+    """
+    Search bounds for a layout vector: (radius, height) per ring followed by one azimuth per drone.
+
+    Parameters:
+    - rings: list of rings, each a list of drone speeds (m/s)
+    """
+    n_drones = sum(len(ring) for ring in rings)
+    return [radius_bounds, height_bounds] * len(rings) + [(0, 2 * np.pi)] * n_drones
+
+
+def decode_layout(x, rings):
+    """
+    Converts a layout vector into drone start positions and speeds.
+
+    Returns:
+    - positions: (N, 3) array of drone coordinates (m)
+    - speeds: (N,) array of drone speeds (m/s)
+    """
+    n_rings = len(rings)
+    azimuths = iter(x[2 * n_rings:])
+
+    positions, speeds = [], []
+    for i, ring in enumerate(rings):
+        radius, height = x[2 * i], x[2 * i + 1]
+        for speed in ring:
+            azimuth = next(azimuths)
+            positions.append([radius * np.cos(azimuth), radius * np.sin(azimuth), height])
+            speeds.append(speed)
+
+    return np.array(positions), np.array(speeds)
+
+
+def calculate_layout_margin(x, rings, threats):
+    """
+    True (expensive) objective: worst coverage margin of a layout over all threats.
+
+    Each threat is assigned to the drone that intercepts it furthest from the origin; the margin of a threat is
+    that distance minus its required intercept distance. Intercepts below ground count as negative distances, as
+    in calculate_worst_intercept.
+    """
+    positions, speeds = decode_layout(x, rings)
+
+    worst_margin = np.inf
+    for azimuth, height, required in threats:
+        p2 = np.array([
+            detection_range * np.cos(azimuth),
+            detection_range * np.sin(azimuth),
+            height
+        ])
+        q = -p2 / np.linalg.norm(p2)
+
+        best_dist = uncovered_penalty
+        for p1, v1 in zip(positions, speeds):
+            try:
+                intercept_coord, intercept_time = find_interception(p1, v1, p2, q, v2)
+            except ValueError:
+                continue
+            intercept_dist = np.linalg.norm(intercept_coord)
+            if intercept_coord[-1] <= 0:
+                intercept_dist = -intercept_dist
+            best_dist = max(best_dist, intercept_dist)
+
+        worst_margin = min(worst_margin, best_dist - required)
+
+    return worst_margin
+
+
+def _select_batch(surrogate, X, lower, upper, best_x, batch_size, sigma, rng, weight_offset=0, n_candidates=2000):
+    """
+    Picks the next points to evaluate from random candidates scored by the surrogate (stochastic RBF).
+
+    Candidates are perturbations of the best layout plus a uniform share for exploration. Each pick trades off
+    the predicted margin against distance to already evaluated or chosen points, cycling through the weights so
+    the search alternates greedy and exploratory points. weight_offset is the number of picks made so far, so the
+    cycle carries across batches and small batches still reach the greedy weights.
+    """
+    dim = len(lower)
+    span = upper - lower
+
+    n_local = int(0.8 * n_candidates)
+    local = best_x + rng.normal(scale=sigma * span, size=(n_local, dim))
+    # only perturb a subset of coordinates so high-dimensional layouts still move locally
+    keep = rng.random((n_local, dim)) > min(1.0, 20.0 / dim)
+    local[keep] = np.broadcast_to(best_x, local.shape)[keep]
+    uniform = lower + rng.random((n_candidates - n_local, dim)) * span
+    candidates = np.clip(np.vstack([local, uniform]), lower, upper)
+
+    scaled = (candidates - lower) / span
+    value_score = _unit_scale(-surrogate(scaled))
+    dist = cdist(scaled, (X - lower) / span).min(axis=1)
+
+    weights = [0.3, 0.5, 0.8, 0.95]
+    batch = []
+    for k in range(batch_size):
+        dist_score = 1 - _unit_scale(dist)
+        w = weights[(weight_offset + k) % len(weights)]
+        score = w * value_score + (1 - w) * dist_score
+        # never pick the same candidate twice in a batch
+        score[dist == 0] = np.inf
+        choice = np.argmin(score)
+
+        batch.append(candidates[choice])
+        dist = np.minimum(dist, np.linalg.norm(scaled - scaled[choice], axis=1))
+
+    return np.array(batch)
+
+
+def _unit_scale(values):
+    spread = np.ptp(values)
+    return (values - values.min()) / spread if spread > 0 else np.zeros_like(values)
+
+
+def optimize_layout(rings, threats, max_evals=500, batch_size=None, n_initial=None, workers=None, seed=None,
+                    verbose=False):
+    """
+    Finds drone positions that maximize the worst coverage margin over a threat sector.
+
+    Every true evaluation runs find_interception for each drone/threat pair, so a plain differential evolution
+    over dozens of dimensions needs far too many of them. Instead an RBF surrogate is fitted to all evaluations so
+    far, a batch of promising candidates is chosen on the surrogate, and the batch is evaluated in parallel.
+    A final differential evolution run on the surrogate proposes one more point near its optimum.
+
+    Parameters:
+    - rings: list of orbit rings, each a list of drone speeds (m/s). Drones in a ring share radius and height.
+    - threats: (T, 3) array from make_threat_sector
+    - max_evals: Budget of true evaluations, including the final one on the surrogate optimum. Must exceed dim + 1.
+    - batch_size: Evaluations per iteration, defaults to the number of workers
+    - n_initial: Size of the initial Latin hypercube design, defaults to 2 * (dim + 1). At least dim + 1, which
+      the RBF's linear tail needs.
+    - workers: Number of worker processes, defaults to the CPU count. 1 evaluates in-process.
+    - seed: Seed for reproducible runs
+
+    Returns:
+    - best_x: Best layout vector, see decode_layout
+    - best_margin: Worst coverage margin of that layout (m)
+    """
+    bounds = np.array(layout_bounds(rings), dtype=float)
+    lower, upper = bounds[:, 0], bounds[:, 1]
+    dim = len(bounds)
+    rng = np.random.default_rng(seed)
+
+    # the initial design needs dim + 1 points for the surrogate, plus one evaluation reserved for the polish step
+    if max_evals < dim + 2:
+        raise ValueError(
+            f"[Error][optimize_layout] max_evals={max_evals} is too small for a {dim}-dimensional layout, "
+            f"need at least {dim + 2}"
+        )
+    if n_initial is None:
+        n_initial = 2 * (dim + 1)
+    n_initial = max(dim + 1, min(n_initial, max_evals - 1))
+
+    objective = partial(calculate_layout_margin, rings=rings, threats=threats)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = workers
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def evaluate(points):
+        if executor is None:
+            return np.array([objective(p) for p in points])
+        return np.array(list(executor.map(objective, points)))
+
+    try:
+        X = qmc.scale(qmc.LatinHypercube(d=dim, seed=rng).random(n_initial), lower, upper)
+        y = evaluate(X)
+
+        sigma, n_success, n_fail, n_picks = 0.2, 0, 0, 0
+        while len(y) < max_evals - 1:
+            best = np.argmax(y)
+            surrogate = _fit_surrogate(X, y, lower, upper)
+
+            n_batch = min(batch_size, max_evals - 1 - len(y))
+            batch = _select_batch(surrogate, X, lower, upper, X[best], n_batch, sigma, rng, weight_offset=n_picks)
+            n_picks += n_batch
+            batch_y = evaluate(batch)
+
+            # shrink the search radius after repeated failures to improve, expand after repeated successes
+            if batch_y.max() > y[best] + 1e-3 * abs(y[best]):
+                n_success, n_fail = n_success + 1, 0
+            else:
+                n_success, n_fail = 0, n_fail + 1
+            if n_success >= 3:
+                sigma, n_success = min(2 * sigma, 0.2), 0
+            elif n_fail >= max(5, dim // batch_size):
+                sigma, n_fail = sigma / 2, 0
+            if sigma < 1e-3:
+                sigma = 0.2
+
+            X, y = np.vstack([X, batch]), np.concatenate([y, batch_y])
+            if verbose:
+                print(f"[Info][optimize_layout] {len(y)} evaluations, worst margin {y.max():.2f} m")
+
+        # polish: optimize the surrogate globally and verify its optimum with one more true evaluation
+        surrogate = _fit_surrogate(X, y, lower, upper)
+        result = differential_evolution(
+            lambda u: -surrogate(u[None, :])[0],
+            bounds=[(0, 1)] * dim,
+            maxiter=100,
+            tol=1e-6,
+            seed=rng.integers(2**32),
+            polish=False
+        )
+        polished_x = lower + result.x * (upper - lower)
+        polished_y = evaluate(polished_x[None, :])[0]
+        if polished_y > y.max():
+            return polished_x, polished_y
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    best = np.argmax(y)
+    return X[best], y[best]
+
+
+def _fit_surrogate(X, y, lower, upper):
+    """
+    Fits a cubic RBF with linear tail on unit-scaled inputs. Uncovered layouts sit on a flat penalty plateau, so
+    values are clipped from below to keep the plateau from dominating the fit.
+    """
+    floor = np.median(y)
+    y_fit = np.maximum(y, floor) if np.ptp(y) > 0 else y
+    return RBFInterpolator((X - lower) / (upper - lower), y_fit, kernel='cubic', degree=1, smoothing=1e-8)
+
+
+if __name__ == "__main__":
+    # two rings of mixed speed drones covering a 120 degree eastern sector, densest due east
+    rings = [[44] * 6, [60] * 2 + [44] * 2]
+    threats = make_threat_sector(
+        azimuth_range=(-np.pi / 3, np.pi / 3),
+        n_azimuth=12,
+        n_height=4,
+        azimuth_density=lambda az: 1 + 2 * np.cos(az),
+        required_dist=2e3
+    )
+
+    best_x, best_margin = optimize_layout(rings, threats, max_evals=200, seed=0, verbose=True)
+    positions, speeds = decode_layout(best_x, rings)
+    for (x, y, z), speed in zip(positions, speeds):
+        print(f"Drone at ({x:.0f}, {y:.0f}, {z:.0f}) m, speed {speed:.0f} m/s")
+    print(f"Worst coverage margin: {best_margin:.2f} m")
@@ -1,16 +1,27 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+from typing import List
+import multiprocessing
+import os
 import random
+import signal
+import threading
 import time
 import math
 
-app = FastAPI()
+from fleet_state import FleetState
 
 # Kharkiv approximate center coordinates
 KHARKIV_LAT = 49.9935
 KHARKIV_LNG = 36.2304
 BASE_ALTITUDE = 100  # meters
 
+N_DRONES = 6  # matches NUM_API_DRONES in app/map-working.jsx
+UPDATE_INTERVAL = 0.1  # seconds between simulation updates
+FLEET_STATE_ENV = "FLEET_STATE_NAME"  # shared memory block name handed to uvicorn workers
+STARTUP_TIMEOUT = 10  # seconds to wait for the simulation's first published step
+
 
 class DronePosition(BaseModel):
     latitude: float
@@ -18,34 +29,148 @@ class DronePosition(BaseModel):
     altitude: float
 
 
-@app.get("/position", response_model=DronePosition)
-async def get_drone_position():
+def simulate_fleet(timestamp, n_drones):
     # Use timestamp to create pseudo-random movement
-    timestamp = time.time()
+    positions = []
 
     # Create a circular pattern with some randomness
     radius = 0.01  # Roughly 1km radius
-    angle = math.radians(timestamp % 360)
-
-    # Add some noise to make movement less predictable
     random.seed(timestamp)
-    noise_lat = random.uniform(-0.001, 0.001)
-    noise_lng = random.uniform(-0.001, 0.001)
+    for i in range(n_drones):
+        # spread the drones evenly around the circle
+        angle = math.radians(timestamp % 360) + 2 * math.pi * i / n_drones
+
+        # Add some noise to make movement less predictable
+        noise_lat = random.uniform(-0.001, 0.001)
+        noise_lng = random.uniform(-0.001, 0.001)
+
+        latitude = KHARKIV_LAT + (radius * math.cos(angle)) + noise_lat
+        longitude = KHARKIV_LNG + (radius * math.sin(angle)) + noise_lng
+
+        # Altitude varies between 80 and 120 meters
+        altitude = BASE_ALTITUDE + math.sin(timestamp + i) * 20
+
+        positions.append((latitude, longitude, altitude))
+
+    return positions
+
+
+def run_simulation(fleet, stop_event=None):
+    """
+    Single writer loop: advances the fleet simulation and publishes each step to the shared fleet state.
+    """
+    while stop_event is None or not stop_event.is_set():
+        timestamp = time.time()
+        fleet.write(simulate_fleet(timestamp, fleet.n_drones), timestamp)
+        time.sleep(UPDATE_INTERVAL)
+
+
+def _simulation_process(name, n_drones, stop_event, ready_event):
+    # the parent stops us through stop_event; Ctrl-C and a process group SIGTERM must still go through fleet.close()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    fleet = FleetState.create(n_drones, name=name)
+    try:
+        fleet.write(simulate_fleet(time.time(), n_drones), time.time())
+        ready_event.set()
+        run_simulation(fleet, stop_event)
+    finally:
+        fleet.close()
+
+
+_fleet = None
 
-    latitude = KHARKIV_LAT + (radius * math.cos(angle)) + noise_lat
-    longitude = KHARKIV_LNG + (radius * math.sin(angle)) + noise_lng
 
-    # Altitude varies between 80 and 120 meters
-    altitude = BASE_ALTITUDE + math.sin(timestamp) * 20
+def get_fleet():
+    return _fleet
 
+
+@asynccontextmanager
+async def lifespan(app):
+    global _fleet
+    name = os.environ.get(FLEET_STATE_ENV)
+    simulation = None
+    if name is not None:
+        _fleet = FleetState.attach(name)
+    else:
+        # started directly with `uvicorn server:app`: simulate in a background thread of this process. Every process
+        # started this way has its own fleet, so multiple workers must be started with `python server.py --workers N`
+        _fleet = FleetState.create(N_DRONES)
+        _fleet.write(simulate_fleet(time.time(), N_DRONES), time.time())
+        stop_event = threading.Event()
+        simulation = threading.Thread(target=run_simulation, args=(_fleet, stop_event), daemon=True)
+        simulation.start()
+
+    try:
+        yield
+    finally:
+        if simulation is not None:
+            stop_event.set()
+            simulation.join()
+        _fleet.close()
+        _fleet = None
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def _to_position(row):
     return DronePosition(
-        latitude=round(latitude, 6),
-        longitude=round(longitude, 6),
-        altitude=round(altitude, 2),
+        latitude=round(float(row[0]), 6),
+        longitude=round(float(row[1]), 6),
+        altitude=round(float(row[2]), 2),
     )
 
 
+@app.get("/position", response_model=DronePosition)
+async def get_drone_position():
+    return get_fleet().read(lambda positions, timestamp: _to_position(positions[0]))
+
+
+@app.get("/position/{drone_id}", response_model=DronePosition)
+async def get_fleet_drone_position(drone_id: int):
+    fleet = get_fleet()
+    if not 0 <= drone_id < fleet.n_drones:
+        raise HTTPException(status_code=404, detail=f"Unknown drone {drone_id}")
+    return fleet.read(lambda positions, timestamp: _to_position(positions[drone_id]))
+
+
+@app.get("/fleet", response_model=List[DronePosition])
+async def get_fleet_positions():
+    return get_fleet().read(lambda positions, timestamp: [_to_position(row) for row in positions])
+
+
 if __name__ == "__main__":
+    import argparse
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--reload", action="store_true", help="single worker that restarts on code changes")
+    args = parser.parse_args()
+
+    # one simulation process owns and writes the fleet state, every uvicorn worker attaches to it by name
+    name = f"ruptor_fleet_{os.getpid()}"
+    stop_event, ready_event = multiprocessing.Event(), multiprocessing.Event()
+    simulation = multiprocessing.Process(target=_simulation_process, args=(name, N_DRONES, stop_event, ready_event))
+    simulation.start()
+    try:
+        # wait for the first published step before serving
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while not ready_event.wait(0.01):
+            if simulation.exitcode is not None:
+                raise RuntimeError(f"[Error][server] simulation process exited with code {simulation.exitcode}")
+            if time.monotonic() > deadline:
+                raise RuntimeError(
+                    f"[Error][server] simulation did not publish a fleet state within {STARTUP_TIMEOUT} s"
+                )
+
+        os.environ[FLEET_STATE_ENV] = name
+        if args.reload:
+            uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True)
+        else:
+            uvicorn.run("server:app", host="0.0.0.0", port=8000, workers=args.workers)
+    finally:
+        stop_event.set()
+        simulation.join()